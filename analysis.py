@@ -0,0 +1,80 @@
+from cube import build_cube, cell_topic_counts, classes, cube_keys, heritage_column, heritage_counts, student_count, \
+    year_column
+from geocode import get_store
+from health import change_labels, health_counts, health_summary, health_table, rating_labels
+from improvements import post_columns, pre_answer_columns, pre_columns
+from ingest import load_workbook
+from keywords import top_keywords
+from profiling import profiled
+from responses import clean_responses
+from teachers import group_options, rank_teachers
+
+sheet_name = 'Student Lifestyle Surveys'
+header_row = 23
+weight_sheet_name = 'Total Weight Loss'  # Spreadsheet name for weight data
+weight_header_row = 8  # Header row for weight data
+bp_sheet_name = "Blood Pressure"  # Spreadsheet name for bp data
+bp_header_row = 5  # Header row for bp data
+waist_sheet_name = "Waist Circumference"  # Spreadsheet for waist data
+waist_header_row = 7  # Header row for waist data
+sheets = {sheet_name: header_row, weight_sheet_name: weight_header_row, bp_sheet_name: bp_header_row,
+          waist_sheet_name: waist_header_row}  # Every sheet the app reads, parsed together
+
+# the survey columns the quantitative analyses read, the qualitative text is loaded on its own when needed
+survey_columns = list(dict.fromkeys(cube_keys + group_options + pre_answer_columns + pre_columns + post_columns +
+                                    [heritage_column]))
+sheet_types = {sheet_name: {**{column: 'category' for column in cube_keys + pre_answer_columns + [heritage_column]
+                               if column != year_column},
+                            **{column: 'number' for column in pre_columns + post_columns + [year_column]}}}
+
+bp_labels = rating_labels
+waist_labels = change_labels
+
+
+def health_statistics(df_health, df_bp, df_waist):
+    '''
+    Weight, blood pressure and waist changes of the health sheets
+    '''
+    return health_summary(health_counts(df_health, df_bp, df_waist, by='Sex'))
+
+
+@profiled('locate classes')
+def locate(locations):
+    '''
+    Add the coordinates of each class in locations (one row per class) and
+    how many classes share them
+    '''
+    locations = locations.copy()
+    location_names = [f'{city}, {state}' for city, state in zip(locations['City'], locations['State'])]
+    coordinates = get_store().resolve(location_names)
+    locations['lat'] = [coordinates[name][0] if coordinates[name] else None for name in location_names]
+    locations['lng'] = [coordinates[name][1] if coordinates[name] else None for name in location_names]
+    locations['Location'] = location_names
+    locations['# of Classes'] = locations.groupby(['lat', 'lng'])['lat'].transform('count')
+    return locations
+
+
+@profiled('analyze workbook')
+def analyze_workbook(excel_file):
+    '''
+    Run every analysis of the app over a whole workbook, without any filters
+    '''
+    workbook = load_workbook(excel_file, sheets, types=sheet_types)
+    df = workbook[sheet_name]
+    cells = build_cube(df)
+    yes, no = heritage_counts(cells)
+    results = {
+        'students': student_count(cells),
+        'heritage': {'yes': yes, 'no': no},
+        'topics': cell_topic_counts(cells),
+        'teachers': rank_teachers(df),
+        'locations': locate(classes(cells)),
+        'keywords': {column: top_keywords(responses) for column, responses in clean_responses(df).items()},
+    }
+    if all(sheet in workbook for sheet in (weight_sheet_name, bp_sheet_name, waist_sheet_name)):
+        counts = health_counts(workbook[weight_sheet_name], workbook[bp_sheet_name], workbook[waist_sheet_name],
+                               by='Sex')
+        results['health'] = health_summary(counts)
+        results['health_table'] = health_table(counts)
+        results['weight_changes'] = workbook[weight_sheet_name]["Weight Change lbs."]
+    return results
@@ -0,0 +1,102 @@
+'''
+Run the analysis over every workbook in a directory without the app:
+
+    python batch.py workbooks/ --out results/ --workers 8
+
+Each workbook gets a folder in the output directory with summary.json,
+Parquet tables of the topic counts, teacher ranking, class locations and
+health statistics by sex, and a static report.html with the charts. --profile adds section timings,
+peak memory and cache hit counts to a JSON lines file.
+'''
+import argparse
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import profiling
+from analysis import analyze_workbook, bp_labels, waist_labels
+from charts import change_pie, improvements_bar, keywords_bar, locations_map, weight_histogram
+from improvements import change_table
+
+
+def report_figures(results):
+    figures = [locations_map(results['locations']),
+               improvements_bar(change_table(results['topics']), '% of People')]
+    if 'health' in results:
+        health = results['health']
+        figures += [weight_histogram(results['weight_changes'], 'Changes in Weight (Overall)'),
+                    change_pie(health['percent_bp'], bp_labels, 'Changes in Blood Pressure Stages'),
+                    change_pie(health['percent_waist'], waist_labels, 'Changes in Waist Inches')]
+    figures += [keywords_bar(counts, column) for column, counts in results['keywords'].items() if counts]
+    return figures
+
+
+def write_report(results, path):
+    figures = report_figures(results)
+    with open(path, 'w') as f:
+        f.write('<html><head><meta charset="utf-8"><title>Oldways Data Analysis</title></head><body>\n')
+        for i, fig in enumerate(figures):
+            f.write(fig.to_html(full_html=False, include_plotlyjs='cdn' if i == 0 else False))
+        f.write('</body></html>\n')
+
+
+def process_workbook(path, out_dir, profile=None, trace_memory=False):
+    '''
+    Analyze one workbook and write its results, returns the output folder.
+    With profile, the timings of every section are appended to that JSON lines file
+    '''
+    profiler = profiling.start(profile is not None, trace_memory)
+    try:
+        name = os.path.splitext(os.path.basename(path))[0]
+        workbook_dir = os.path.join(out_dir, name)
+        os.makedirs(workbook_dir, exist_ok=True)
+
+        results = analyze_workbook(path)
+        summary = {'workbook': os.path.basename(path), 'students': results['students'],
+                   'heritage': results['heritage'], 'keywords': results['keywords'], 'health': results.get('health')}
+        with open(os.path.join(workbook_dir, 'summary.json'), 'w') as f:
+            json.dump(summary, f, indent=2, default=float)
+        results['topics'].rename_axis('Topic').reset_index().to_parquet(os.path.join(workbook_dir, 'topics.parquet'))
+        results['teachers'].to_parquet(os.path.join(workbook_dir, 'teachers.parquet'))
+        results['locations'].to_parquet(os.path.join(workbook_dir, 'locations.parquet'))
+        if 'health_table' in results:
+            results['health_table'].to_parquet(os.path.join(workbook_dir, 'health.parquet'))
+        with profiling.section('write report'):
+            write_report(results, os.path.join(workbook_dir, 'report.html'))
+        if profile is not None:
+            profiler.export(profile, workbook=os.path.basename(path))
+        return workbook_dir
+    finally:
+        profiler.close()  # also when the workbook fails, the worker goes on to the next one
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Analyze a directory of Oldways workbooks.')
+    parser.add_argument('directory', help='folder holding the .xlsx workbooks')
+    parser.add_argument('--out', default='results', help='folder to write the results to')
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help='number of worker processes')
+    parser.add_argument('--geocoder', choices=['google', 'gazetteer', 'stub'],
+                        help='where to look up class locations the geocode store is missing')
+    parser.add_argument('--profile', help='append the timings of every workbook to this JSON lines file')
+    parser.add_argument('--profile-memory', action='store_true', help='also trace peak memory (slower)')
+    args = parser.parse_args()
+
+    if args.geocoder:
+        os.environ['OLDWAYS_GEOCODER'] = args.geocoder  # inherited by the workers
+    paths = sorted(os.path.join(args.directory, name) for name in os.listdir(args.directory)
+                   if name.endswith('.xlsx') and not name.startswith('~$'))
+    failed = 0
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        futures = {pool.submit(process_workbook, path, args.out, args.profile, args.profile_memory): path for path in paths}
+        for future in as_completed(futures):
+            try:
+                print(f'{futures[future]} -> {future.result()}')
+            except Exception as e:
+                failed += 1
+                print(f'{futures[future]} failed: {e!r}')
+    print(f'Analyzed {len(paths) - failed} of {len(paths)} workbooks')
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
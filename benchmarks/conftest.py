@@ -0,0 +1,74 @@
+'''
+Benchmarks of the analysis hot paths over synthetic workbooks. Needs
+pytest-benchmark. Run from the repository root:
+
+    python -m pytest benchmarks --students 1000,100000
+
+Every run is saved under .benchmarks/, compare against an earlier one with
+--benchmark-compare (or --benchmark-compare=0001).
+'''
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import ingest  # noqa: E402
+from analysis import bp_sheet_name, sheet_name, sheet_types, sheets, survey_columns  # noqa: E402
+from analysis import waist_sheet_name, weight_sheet_name  # noqa: E402
+from responses import qualitative_columns  # noqa: E402
+from synthetic import generate_workbook  # noqa: E402
+
+workbook_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'workbooks')
+
+
+def pytest_addoption(parser):
+    parser.addoption('--students', default='1000,10000',
+                     help='comma separated workbook sizes to benchmark, e.g. 1000,100000,1000000')
+
+
+def pytest_generate_tests(metafunc):
+    if 'students' in metafunc.fixturenames:
+        sizes = [int(size) for size in metafunc.config.getoption('students').split(',')]
+        metafunc.parametrize('students', sizes, scope='session')
+
+
+@pytest.fixture(scope='session')
+def workbook_path(students):
+    '''
+    Synthetic workbook of the given size, generated once and kept between runs
+    '''
+    path = os.path.join(workbook_dir, f'students-{students}.xlsx')
+    if not os.path.exists(path):
+        os.makedirs(workbook_dir, exist_ok=True)
+        generate_workbook(path, students)
+    return path
+
+
+@pytest.fixture(scope='session')
+def workbook(workbook_path, tmp_path_factory):
+    '''
+    Every sheet loaded with the app's types, the survey without its free text
+    '''
+    ingest.cache_dir = str(tmp_path_factory.mktemp('parquet'))
+    return ingest.load_workbook(workbook_path, sheets, columns={sheet_name: survey_columns}, types=sheet_types)
+
+
+@pytest.fixture(scope='session')
+def survey(workbook):
+    return workbook[sheet_name]
+
+
+@pytest.fixture(scope='session')
+def responses(workbook_path, workbook):
+    '''
+    The free text columns of the survey, loaded on their own like the app does
+    '''
+    return ingest.load_workbook(workbook_path, {sheet_name: sheets[sheet_name]},
+                                columns={sheet_name: qualitative_columns}, types=sheet_types)[sheet_name]
+
+
+@pytest.fixture(scope='session')
+def health(workbook):
+    return workbook[weight_sheet_name], workbook[bp_sheet_name], workbook[waist_sheet_name]
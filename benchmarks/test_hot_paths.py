@@ -0,0 +1,111 @@
+import ingest
+from analysis import sheet_name, sheet_types, sheets, survey_columns
+from cube import build_cube, select, year_column
+from geocode import GeocodeStore, StubProvider
+from health import health_counts, health_table
+from improvements import get_df_percentages
+from keywords import count_keywords
+from responses import clean_responses, recipes_column
+from search import ResponseIndex
+from teachers import rank_teachers
+
+app_load = {'columns': {sheet_name: survey_columns}, 'types': sheet_types}  # how the app loads a workbook
+
+
+def test_load_workbook_excel(benchmark, workbook_path, tmp_path):
+    '''
+    Parsing every sheet from the xlsx, nothing cached yet
+    '''
+    def cold_cache():
+        ingest._loaded.clear()
+        ingest.cache_dir = str(tmp_path / f'cold-{len(list(tmp_path.iterdir()))}')
+        return (workbook_path, sheets), app_load
+
+    benchmark.pedantic(ingest.load_workbook, setup=cold_cache, rounds=3)
+
+
+def test_load_workbook_parquet(benchmark, workbook_path, tmp_path):
+    '''
+    Loading the same workbook again from its Parquet cache
+    '''
+    ingest.cache_dir = str(tmp_path)
+    ingest.load_workbook(workbook_path, sheets, **app_load)
+
+    def warm_cache():
+        ingest._loaded.clear()
+        return (workbook_path, sheets), app_load
+
+    benchmark.pedantic(ingest.load_workbook, setup=warm_cache, rounds=10)
+
+
+def test_get_df_percentages(benchmark, survey):
+    benchmark(get_df_percentages, survey)
+
+
+def test_rank_teachers(benchmark, survey):
+    benchmark(rank_teachers, survey)
+
+
+def test_rank_teachers_by_year(benchmark, survey):
+    benchmark(rank_teachers, survey, ['Teacher Name', 'Class End Date (year)'])
+
+
+def test_build_cube(benchmark, survey):
+    benchmark(build_cube, survey)
+
+
+def test_select_cube(benchmark, survey):
+    '''
+    The cells of the later years' classes of half the teachers, what every filter change of the app runs
+    '''
+    cube = build_cube(survey)
+    years = cube.index.get_level_values(year_column)
+    teachers = cube.index.get_level_values('Teacher Name').unique()
+    start_year, end_year = int(years.min()), int(years.max())
+    benchmark(select, cube, (start_year + end_year) // 2, end_year, list(teachers[::2]))
+
+
+def test_health_counts(benchmark, health):
+    benchmark(health_counts, *health, by='Sex')
+
+
+def test_health_table_by_teacher(benchmark, health):
+    benchmark(lambda: health_table(health_counts(*health, by='Teacher Name')))
+
+
+def test_count_keywords(benchmark, responses):
+    benchmark(count_keywords, responses[recipes_column])
+
+
+def test_count_keyword_pairs(benchmark, responses):
+    benchmark(count_keywords, responses[recipes_column], 2)
+
+
+def test_clean_responses(benchmark, responses):
+    benchmark(clean_responses, responses)
+
+
+def test_build_search_index(benchmark, responses):
+    benchmark(ResponseIndex, clean_responses(responses))
+
+
+def test_search_responses(benchmark, survey, responses):
+    '''
+    A word and a prefix, limited to the classes of the later years
+    '''
+    index = ResponseIndex(clean_responses(responses))
+    rows = survey.index[survey['Class End Date (year)'] >= survey['Class End Date (year)'].median()]
+    benchmark(index.search, 'greens bea*', rows)
+
+
+def test_geocode_resolve(benchmark, survey, tmp_path):
+    '''
+    Resolving every class location against an empty store with the stub provider
+    '''
+    names = [f'{city}, {state}' for city, state in zip(survey['City'], survey['State'])]
+
+    def empty_store():
+        path = tmp_path / f'geocode-{len(list(tmp_path.iterdir()))}.sqlite'
+        return (GeocodeStore(str(path), StubProvider(), seed_path=None), names), {}
+
+    benchmark.pedantic(GeocodeStore.resolve, setup=empty_store, rounds=5)
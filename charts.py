@@ -0,0 +1,60 @@
+import numpy as np
+import pandas as pd
+import plotly.express as px
+from plotly.colors import label_rgb as rgb
+
+change_colors = {'Increased': rgb((166, 216, 84)),
+                 'No Change': rgb((255, 217, 47)),
+                 'Decreased': rgb((252, 141, 98))}
+
+
+def bin_values(values, bins=40):
+    '''
+    Histogram of values (blanks skipped) as a frame of bin edges and counts,
+    so a chart sends one bar per bin rather than every value to the browser
+    '''
+    values = pd.to_numeric(pd.Series(values), errors='coerce').dropna().to_numpy()
+    counts, edges = np.histogram(values, bins=bins)
+    return pd.DataFrame({'From': edges[:-1], 'To': edges[1:], 'Count': counts})
+
+
+def weight_histogram(weight_changes, title, bins=40):
+    binned = bin_values(weight_changes, bins)
+    fig = px.bar(binned, x=(binned['From'] + binned['To']) / 2, y='Count', title=title,
+                 hover_data={'From': ':.1f', 'To': ':.1f'}, labels={'x': 'Weight Lost'})
+    fig.update_traces(width=(binned['To'] - binned['From']).to_numpy())
+    return fig
+
+
+def change_pie(percentages, labels, title):
+    fig = px.pie(title=title, values=percentages, names=labels)
+    fig.update_traces(textposition='inside', textinfo='label+percent')
+    return fig
+
+
+def health_bar(table, statistic, title):
+    '''
+    A statistic of every measure of a tidy health_table, one bar per group
+    '''
+    rows = table[table['statistic'] == statistic].fillna({'group': 'Unknown'})
+    return px.bar(rows, x='measure', y='value', color='group', barmode='group', title=title,
+                  labels={'measure': 'Measure', 'value': statistic, 'group': 'Group'})
+
+
+def locations_map(locations):
+    '''
+    Map of the classes in a locate()d location table, sized by classes per place
+    '''
+    return px.scatter_geo(locations.dropna(subset=['lat', 'lng']), lat="lat", lon='lng', size='# of Classes',
+                          projection='albers usa',
+                          hover_data={'lat': False, 'lng': False, '# of Classes': True, 'Location': True},
+                          title='Class Locations', size_max=25)
+
+
+def improvements_bar(percentage_df, y):
+    return px.bar(percentage_df, x='Category', y=y, color='Change', color_discrete_map=change_colors)
+
+
+def keywords_bar(counts, title):
+    chart_data = pd.DataFrame({'Key Word': list(counts.keys()), 'Count': list(counts.values())})
+    return px.bar(chart_data, x='Key Word', y='Count', title=title)
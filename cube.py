@@ -0,0 +1,78 @@
+import pandas as pd
+
+from improvements import summed_topic_counts, topic_indicators
+from profiling import profiled
+
+year_column = 'Class End Date (year)'
+heritage_column = 'History & Heritage Positive Motivators?'
+# one cell per class, the same columns the location table is built from
+cube_keys = ['Class Type', 'Teacher Name', year_column, 'Class Location Type', 'City', 'State']
+
+
+@profiled('build cube')
+def build_cube(df):
+    '''
+    Pre-aggregate the survey into one row per class holding additive counts:
+    students, heritage yes/no answers and the increased/same/answered counts
+    of every topic. Any filter on the keys can then be answered by summing rows
+    '''
+    heritage = df[heritage_column].str.lower()
+    cells = topic_indicators(df)
+    cells[('Students', '')] = 1
+    cells[('Heritage', 'yes')] = (heritage == 'yes').astype(int)
+    cells[('Heritage', 'no')] = (heritage == 'no').astype(int)
+    return cells.groupby([df[key] for key in cube_keys], sort=False, dropna=False, observed=True).sum()
+
+
+def merge_cubes(*cubes):
+    '''
+    Add cubes built from different students together, cell by cell
+    '''
+    merged = pd.concat(cubes)
+    return merged.groupby(level=list(range(merged.index.nlevels)), sort=False, dropna=False, observed=True).sum()
+
+
+def select(cube, start_year, end_year, teachers=None):
+    '''
+    The cube cells of classes that ended between the years (inclusive),
+    taught by any of the teachers if given
+    '''
+    years = cube.index.get_level_values(year_column)
+    mask = (start_year <= years) & (years <= end_year)
+    if teachers is not None:
+        mask &= cube.index.get_level_values('Teacher Name').isin(teachers)
+    return cube[mask]
+
+
+def cube_teachers(cells):
+    '''
+    Teachers of the selected cells, in the order they first appear in the survey
+    '''
+    return list(cells.index.get_level_values('Teacher Name').unique())
+
+
+def classes(cells):
+    '''
+    One row per class in the cells, with the class metadata as columns
+    '''
+    return cells.index.to_frame(index=False)
+
+
+def student_count(cells):
+    return int(cells[('Students', '')].sum())
+
+
+def heritage_counts(cells):
+    '''
+    Number of (yes, no) answers to the heritage motivation question. Like
+    the original app, yes is 1 when nobody said yes so the share of yes
+    answers can always be computed
+    '''
+    return int(cells[('Heritage', 'yes')].sum()) or 1, int(cells[('Heritage', 'no')].sum())
+
+
+def cell_topic_counts(cells):
+    '''
+    The same counts as improvements.topic_counts for the students in the cells
+    '''
+    return summed_topic_counts(cells)
@@ -0,0 +1,147 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import profiling
+
+gazetteer_path = 'loaction_dump.json'  # Bundled "City, State" -> coordinates, seeds the store
+store_path = 'geocode.sqlite'
+max_workers = 8  # Concurrent lookups for locations the store hasn't seen
+retry_after = 7 * 24 * 60 * 60  # seconds before a location the provider couldn't find is looked up again
+
+
+class GoogleProvider:
+    '''
+    Look locations up with the Google geocoding API
+    '''
+    persist = True  # real coordinates, kept in the store
+
+    def lookup(self, location):
+        import geocoder  # only needed when something actually goes to the network
+        try:
+            latlng = geocoder.google(location).latlng
+        except Exception:  # connection errors, quota, ...
+            return None
+        return None if latlng is None else (latlng[0], latlng[1])
+
+
+class GazetteerProvider:
+    '''
+    Look locations up in a local JSON gazetteer, no network needed
+    '''
+    persist = True
+
+    def __init__(self, path=gazetteer_path):
+        self.places = {}
+        if os.path.exists(path):
+            with open(path, 'r') as f:
+                self.places = json.load(f)
+
+    def lookup(self, location):
+        place = self.places.get(location)
+        return None if place is None else (place['lat'], place['lng'])
+
+
+class StubProvider:
+    '''
+    Give every location a made up but stable point inside the continental US,
+    for running offline and for benchmarks. Its points are never stored,
+    so they can't stand in for real ones later
+    '''
+    persist = False
+
+    def lookup(self, location):
+        digest = hashlib.sha256(location.encode()).digest()
+        return 25 + 24 * digest[0] / 255, -124 + 57 * digest[1] / 255
+
+
+providers = {'google': GoogleProvider, 'gazetteer': GazetteerProvider, 'stub': StubProvider}
+
+
+class GeocodeStore:
+    '''
+    Coordinates of "City, State" locations, kept in an indexed SQLite file
+    and read into memory once. Locations the store doesn't know are resolved
+    through the provider with a pool of workers and written in one transaction.
+    Locations the provider couldn't find are remembered too, and only tried
+    again after retry_after seconds. What a provider without persist finds
+    is only kept in memory
+    '''
+
+    def __init__(self, path=store_path, provider=None, seed_path=gazetteer_path):
+        self.provider = provider if provider is not None else GoogleProvider()
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        with self._db:
+            self._db.execute('CREATE TABLE IF NOT EXISTS locations '
+                             '(name TEXT PRIMARY KEY, lat REAL NOT NULL, lng REAL NOT NULL)')
+            self._db.execute('CREATE TABLE IF NOT EXISTS failures (name TEXT PRIMARY KEY, failed_at REAL NOT NULL)')
+        self.coordinates = {name: (lat, lng) for name, lat, lng in self._db.execute('SELECT * FROM locations')}
+        self.failed = {name: failed_at for name, failed_at in self._db.execute('SELECT * FROM failures')}
+        if not self.coordinates and seed_path is not None:
+            places = GazetteerProvider(seed_path).places
+            self._save({name: (place['lat'], place['lng']) for name, place in places.items()})
+
+    def _save(self, found, failed=()):
+        failed = {name: time.time() for name in failed}
+        if not found and not failed:
+            return
+        try:
+            with self._db:  # one transaction, either every row lands or none do
+                self._db.executemany('INSERT OR REPLACE INTO locations VALUES (?, ?, ?)',
+                                     [(name, lat, lng) for name, (lat, lng) in found.items()])
+                self._db.executemany('INSERT OR REPLACE INTO failures VALUES (?, ?)', failed.items())
+                self._db.executemany('DELETE FROM failures WHERE name = ?', [(name,) for name in found])
+        except sqlite3.OperationalError:
+            pass  # read-only disk, keep the results for this process only
+        self.coordinates.update(found)
+        self.failed.update(failed)
+        for name in found:
+            self.failed.pop(name, None)
+
+    def _known(self, location, now):
+        return location in self.coordinates or now - self.failed.get(location, -retry_after) < retry_after
+
+    def resolve(self, locations):
+        '''
+        Map each of the given locations to (lat, lng), or None if the
+        provider couldn't find it
+        '''
+        wanted = set(locations)
+        with self._lock:
+            now = time.time()
+            unseen = [location for location in wanted if not self._known(location, now)]
+        profiling.current().cache_hit('geocode', len(wanted) - len(unseen))
+        profiling.current().cache_miss('geocode', len(unseen))
+        if unseen:  # without the lock, other sessions aren't held up by slow lookups
+            with profiling.section('geocode lookups', len(unseen)), \
+                    ThreadPoolExecutor(max_workers=min(max_workers, len(unseen))) as pool:
+                results = list(pool.map(self.provider.lookup, unseen))
+            found = {location: latlng for location, latlng in zip(unseen, results) if latlng is not None}
+            with self._lock:
+                if self.provider.persist:
+                    self._save(found, [location for location, latlng in zip(unseen, results) if latlng is None])
+                else:  # made up points, for this process only
+                    self.coordinates.update(found)
+        with self._lock:
+            return {location: self.coordinates.get(location) for location in wanted}
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store():
+    '''
+    The process wide GeocodeStore, using the provider named by the
+    OLDWAYS_GEOCODER environment variable (google, gazetteer or stub)
+    '''
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = GeocodeStore(provider=providers[os.environ.get('OLDWAYS_GEOCODER', 'google')]())
+    return _store
@@ -0,0 +1,151 @@
+import numpy as np
+import pandas as pd
+
+from profiling import profiled
+
+weight_column = 'Weight Change lbs.'
+sys_column = 'Change in Sys BP'
+dia_column = 'Change in Dia BP'
+rating_column = 'Change in New HPB Rating'
+waist_column = 'Inches Lossed'
+change_labels = ['Lost', 'No Change', 'Gained']  # positive changes are losses
+rating_labels = ['Decrease', 'No Change', 'Increase']
+stage_column = 'HPB Stage'  # the measure of the stage transitions
+start_stage_column = 'Unnamed: 8'  # HPB stage (as a number) at the start, named in the unlabelled column before it
+end_stage_column = 'Unnamed: 12'  # and at the end
+stage_labels = {1: 'Normal', 2: 'Elevated', 3: 'HPB Stage 1', 4: 'HPB Stage 2'}
+transition_labels = [f'{start} to {end}' for start in stage_labels.values() for end in stage_labels.values()]
+breakdowns = ['Sex', 'Teacher Name', 'Class End Date (year)', 'Class Type']  # Used when a health sheet has them
+
+
+def _indicators(df, changes=(), ratings=(), stages=False):
+    '''
+    Additive columns (measure, statistic) of every row: 1 per row, 1 if
+    answered, and the change itself or 1 for the category it falls in.
+    With stages, 1 for the transition between the start and end HPB stages
+    '''
+    columns = {}
+    for column in changes:
+        values = pd.to_numeric(df[column], errors='coerce') if column in df else pd.Series(np.nan, index=df.index)
+        columns[(column, 'rows')] = np.ones(len(df))
+        columns[(column, 'answered')] = values.notna()
+        columns[(column, 'sum')] = values.fillna(0)
+        columns[(column, 'Lost')] = values > 0
+        columns[(column, 'No Change')] = values == 0
+        columns[(column, 'Gained')] = values < 0
+    for column in ratings:
+        values = df[column] if column in df else pd.Series(np.nan, index=df.index)
+        columns[(column, 'rows')] = np.ones(len(df))
+        columns[(column, 'answered')] = values.isin(rating_labels)
+        for label in rating_labels:
+            columns[(column, label)] = values == label
+    if stages:
+        start, end = (pd.to_numeric(df[column], errors='coerce') if column in df else pd.Series(np.nan, index=df.index)
+                      for column in (start_stage_column, end_stage_column))
+        columns[(stage_column, 'rows')] = np.ones(len(df))
+        columns[(stage_column, 'answered')] = start.isin(list(stage_labels)) & end.isin(list(stage_labels))
+        for start_level, start_label in stage_labels.items():
+            for end_level, end_label in stage_labels.items():
+                columns[(stage_column, f'{start_label} to {end_label}')] = (start == start_level) & (end == end_level)
+    return pd.DataFrame(columns, index=df.index).astype(float)
+
+
+@profiled('health counts')
+def health_counts(df_health, df_bp, df_waist, by=None):
+    '''
+    The additive counts behind the health statistics, one row per value of
+    the by column (NaN for sheets that don't have it), or a single 'All' row.
+    Counts of different students can simply be added together
+    '''
+    grouped = []
+    for df, changes, ratings, stages in ((df_health, [weight_column], [], False),
+                                         (df_bp, [sys_column, dia_column], [rating_column], True),
+                                         (df_waist, [waist_column], [], False)):
+        if by is None:
+            keys = pd.Series('All', index=df.index, name='group')
+        else:
+            keys = df[by] if by in df else pd.Series(np.nan, index=df.index)
+            if not pd.api.types.is_numeric_dtype(keys):
+                keys = keys.str.strip()  # 'Philly ' is 'Philly'
+            keys = keys.rename(by)
+        grouped.append(_indicators(df, changes, ratings, stages).groupby(keys, dropna=False, observed=True).sum())
+    return pd.concat(grouped, axis=1).fillna(0)
+
+
+def health_table(counts):
+    '''
+    Tidy statistics from health_counts: one row per group, measure and
+    statistic ('students', 'answered', 'mean' and the % of answers in each
+    change or rating category, or the number of students making each HPB
+    stage transition), blank answers left out of means and shares
+    '''
+    rows = []
+    for measure in counts.columns.get_level_values(0).unique():
+        measure_counts = counts[measure]
+        answered = measure_counts['answered'].replace(0, np.nan)
+        statistics = {'students': measure_counts['rows'], 'answered': measure_counts['answered']}
+        if 'sum' in measure_counts:
+            statistics['mean'] = measure_counts['sum'] / answered
+        if measure == stage_column:
+            for label in transition_labels:
+                statistics[label] = measure_counts[label]
+        else:
+            labels = rating_labels if measure == rating_column else change_labels
+            for label in labels:
+                statistics[f'% {label}'] = 100 * measure_counts[label] / answered
+        for statistic, values in statistics.items():
+            rows.append(pd.DataFrame({'group': counts.index, 'measure': measure, 'statistic': statistic,
+                                      'value': values.to_numpy()}))
+    return pd.concat(rows, ignore_index=True)
+
+
+def overall(counts):
+    '''
+    health_counts of every group added together as a single 'All' row
+    '''
+    return counts.sum().to_frame('All').T.rename_axis('group')
+
+
+def statistic(table, measure, name, group='All'):
+    matches = table[(table['measure'] == measure) & (table['statistic'] == name) & (table['group'] == group)]
+    return float(matches['value'].iloc[0]) if len(matches) else float('nan')
+
+
+def shares(table, measure, group='All'):
+    '''
+    (% values, labels) of the change or rating categories of a measure, for pie charts
+    '''
+    labels = rating_labels if measure == rating_column else change_labels
+    return [statistic(table, measure, f'% {label}', group) for label in labels], labels
+
+
+def stage_transitions(table, group='All'):
+    '''
+    {start stage: {end stage: number of students}} of the HPB stage transitions
+    '''
+    return {start: {end: int(statistic(table, stage_column, f'{start} to {end}', group))
+                    for end in stage_labels.values()}
+            for start in stage_labels.values()}
+
+
+def health_summary(counts):
+    '''
+    The overall numbers the Health Statistics section reports, from
+    health_counts broken down by 'Sex'
+    '''
+    table = pd.concat([health_table(counts), health_table(overall(counts))], ignore_index=True)
+    return {
+        'students': int(statistic(table, weight_column, 'students')),
+        'average_weight_loss': statistic(table, weight_column, 'mean'),
+        'males': int(np.nan_to_num(statistic(table, weight_column, 'students', 'M'))),
+        'average_male_loss': statistic(table, weight_column, 'mean', 'M'),
+        'females': int(np.nan_to_num(statistic(table, weight_column, 'students', 'F'))),
+        'average_female_loss': statistic(table, weight_column, 'mean', 'F'),
+        'percent_bp': shares(table, rating_column)[0],
+        'average_sys_bp': statistic(table, sys_column, 'mean'),
+        'average_dia_bp': statistic(table, dia_column, 'mean'),
+        'stage_transitions': stage_transitions(table),
+        'waist_students': int(statistic(table, waist_column, 'students')),
+        'percent_waist': shares(table, waist_column)[0],
+        'average_waist': statistic(table, waist_column, 'mean'),
+    }
@@ -0,0 +1,105 @@
+import numpy as np
+import pandas as pd
+
+topics = ['Cooking Frequency', 'Herbs and Spices', 'Greens', 'Whole Grains', 'Beans', 'Tubers',
+          'Vegetables',
+          'Fruits',
+          'Vegetarian-Based Meals', 'Exercise']
+changes = ['Increased', 'No Change', 'Decreased']
+
+
+def topic_columns(i):
+    '''
+    Names of the (pre answer, pre number, post number) columns of topic i
+    '''
+    suffix = '' if i == 0 else f'.{i}'  # artifact of how spreadsheet is formatted
+    return 'Pre' + suffix, 'Pre - Num' + suffix, 'Post Num' + suffix
+
+
+pre_answer_columns, pre_columns, post_columns = (list(names) for names in
+                                                 zip(*(topic_columns(i) for i in range(len(topics)))))
+
+
+def topic_differences(df):
+    '''
+    Post - pre difference of every student (rows) in every topic (columns)
+    as one matrix, NaN where the student didn't answer the topic
+    '''
+    pre = df[pre_columns].to_numpy(dtype=float, na_value=np.nan)
+    post = df[post_columns].to_numpy(dtype=float, na_value=np.nan)
+    difference = post - pre
+    difference[df[pre_answer_columns].isna().to_numpy()] = np.nan
+    return difference
+
+
+def topic_counts(df):
+    '''
+    Count how many students increased, didn't change or decreased in
+    every topic, in a single pass over the pre/post columns
+    '''
+    difference = topic_differences(df)
+    return _counts_frame((difference > 0).sum(axis=0), (difference == 0).sum(axis=0),
+                         (~np.isnan(difference)).sum(axis=0))
+
+
+def _counts_frame(increased, same, total):
+    return pd.DataFrame({'Increased': increased, 'No Change': same, 'Decreased': total - increased - same,
+                         'Total': total}, index=topics)
+
+
+def topic_indicators(df):
+    '''
+    0/1 columns (Increased, No Change, Total) x topic saying whether each
+    student increased, didn't change and answered the topic, ready to be summed
+    '''
+    difference = topic_differences(df)
+    indicators = np.concatenate([difference > 0, difference == 0, ~np.isnan(difference)], axis=1)
+    columns = pd.MultiIndex.from_product([['Increased', 'No Change', 'Total'], topics])
+    return pd.DataFrame(indicators.astype(np.int64), columns=columns, index=df.index)
+
+
+def grouped_topic_counts(df, keys, dropna=True):
+    '''
+    Number of students that increased, didn't change, and answered each
+    topic for every group of keys, with a single groupby over all topics
+    '''
+    return topic_indicators(df).groupby([df[key] for key in keys], sort=False, dropna=dropna, observed=True).sum()
+
+
+def summed_topic_counts(grouped):
+    '''
+    Add up rows of grouped_topic_counts into the same counts as topic_counts
+    '''
+    sums = grouped[['Increased', 'No Change', 'Total']].sum()
+    return _counts_frame(sums['Increased'].to_numpy(), sums['No Change'].to_numpy(), sums['Total'].to_numpy())
+
+
+def topic_percentages(counts):
+    '''
+    Turn the topic_counts into the percentage of students answering each topic
+    '''
+    return 100 * counts[changes].div(counts['Total'], axis=0)
+
+
+def change_table(counts, percent=True):
+    '''
+    Rows of (value, Change, Category) for the improvements chart, either
+    the % of people rounded to 2 places or the # of people
+    '''
+    if percent:
+        values = topic_percentages(counts).round(2)
+        values['Decreased'] = 100 - values['Increased'] - values['No Change']
+    else:
+        values = counts[changes]
+    rows = [[values.at[topic, change], change, topic] for topic in topics for change in changes]
+    return pd.DataFrame(rows, columns=[f'{"%" if percent else "#"} of People', 'Change', 'Category'])
+
+
+def get_df_percentages(df):
+    '''
+    Average % of students that increased and stayed the same across the
+    topics, and the average number of students answering a topic
+    '''
+    counts = topic_counts(df)
+    percentages = topic_percentages(counts)
+    return percentages['Increased'].mean(), percentages['No Change'].mean(), counts['Total'].mean()
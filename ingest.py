@@ -0,0 +1,219 @@
+import hashlib
+import os
+import shutil
+import tempfile
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+import profiling
+
+cache_dir = '.oldways_cache'  # Where parsed sheets are kept between runs
+cache_limit = 2 * 2 ** 30  # bytes the cached sheets may take, the workbooks used longest ago are removed past it
+_loaded = {}  # Workbooks already loaded by this process, keyed by file hash
+_max_loaded = 8  # a workbook can be loaded with different columns
+_upload_digests = {}  # file hash of every upload seen, keyed by its id, name and size
+_max_upload_digests = 64
+
+
+def file_hash(excel_file):
+    '''
+    Compute the SHA-256 of an uploaded file (or a path) without
+    moving the read position of the upload
+    '''
+    sha = hashlib.sha256()
+    if isinstance(excel_file, (str, os.PathLike)):
+        with open(excel_file, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                sha.update(chunk)
+    elif hasattr(excel_file, 'getbuffer'):  # streamlit uploads are BytesIO
+        sha.update(excel_file.getbuffer())
+    else:
+        position = excel_file.tell()
+        excel_file.seek(0)
+        for chunk in iter(lambda: excel_file.read(1 << 20), b''):
+            sha.update(chunk)
+        excel_file.seek(position)
+    return sha.hexdigest()
+
+
+def upload_hash(upload):
+    '''
+    file_hash of a streamlit upload, computed once per upload rather than on
+    every rerun: reruns get the same file id, name and size back. Anything
+    without a file id is hashed every time
+    '''
+    file_id = getattr(upload, 'file_id', None) or getattr(upload, 'id', None)
+    if file_id is None:
+        return file_hash(upload)
+    key = (file_id, getattr(upload, 'name', None), getattr(upload, 'size', None))
+    if key not in _upload_digests:
+        if len(_upload_digests) >= _max_upload_digests:
+            _upload_digests.pop(next(iter(_upload_digests)))
+        _upload_digests[key] = file_hash(upload)
+    return _upload_digests[key]
+
+
+def prune_cache(limit=cache_limit, keep=None):
+    '''
+    Remove the cached workbooks used longest ago (except keep, a file hash)
+    until the cache takes at most limit bytes. The cache can also simply be
+    deleted whenever no app is running
+    '''
+    if not os.path.isdir(cache_dir):
+        return
+    workbooks = []
+    for digest in os.listdir(cache_dir):
+        path = os.path.join(cache_dir, digest)
+        if os.path.isdir(path) and digest != keep:
+            size = sum(os.path.getsize(os.path.join(path, name)) for name in os.listdir(path))
+            workbooks.append((os.path.getmtime(path), size, path))
+    total = sum(size for _, size, _ in workbooks)
+    if keep is not None and os.path.isdir(os.path.join(cache_dir, keep)):
+        total += sum(os.path.getsize(os.path.join(cache_dir, keep, name))
+                     for name in os.listdir(os.path.join(cache_dir, keep)))
+    for _, size, path in sorted(workbooks):
+        if total <= limit:
+            break
+        shutil.rmtree(path, ignore_errors=True)
+        total -= size
+
+
+def _sheet_path(digest, sheet_name, header_row):
+    safe_name = ''.join(c if c.isalnum() else '_' for c in sheet_name)
+    return os.path.join(cache_dir, digest, f'{safe_name}-{header_row}.parquet')
+
+
+def to_arrow_safe(df):
+    '''
+    Make a parsed sheet storable as Parquet: column names must be strings
+    and object columns may not mix types (e.g. a number typed into a text
+    column), so mixed cells are stored as their text
+    '''
+    df = df.copy()
+    df.columns = [str(c) for c in df.columns]
+    for column in df.columns:
+        if df[column].dtype == object and pd.api.types.infer_dtype(df[column], skipna=True) != 'string':
+            df[column] = df[column].map(lambda x: x if pd.isna(x) else str(x))
+    return df
+
+
+def compact(df, types):
+    '''
+    Store the columns named in types ({column: 'category' or 'number'}) in
+    compact types: repetitive text as categoricals, and numbers as the
+    smallest nullable integer type that holds them, or float32 when they
+    have fractions. Columns df doesn't have are skipped
+    '''
+    df = df.copy(deep=False)
+    for column, kind in types.items():
+        if column not in df:
+            continue
+        if kind == 'category':
+            if not isinstance(df[column].dtype, pd.CategoricalDtype):
+                df[column] = df[column].astype('category')
+            continue
+        values = pd.to_numeric(df[column], errors='coerce')
+        present = values.dropna()
+        if len(present) and not (present % 1 == 0).all():
+            df[column] = values.astype('float32')
+            continue
+        for dtype in ('Int8', 'Int16', 'Int32', 'Int64'):
+            limits = np.iinfo(dtype.lower())
+            if not len(present) or (limits.min <= present.min() and present.max() <= limits.max):
+                df[column] = values.astype(dtype)
+                break
+    return df
+
+
+def write_parquet(df, path):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # a temp file of its own, sessions are threads of one process and may write the same sheet at once
+    handle, tmp_path = tempfile.mkstemp(suffix='.tmp', dir=os.path.dirname(path))
+    os.close(handle)
+    try:
+        pq.write_table(pa.Table.from_pandas(df, preserve_index=False), tmp_path)
+        os.replace(tmp_path, path)  # readers never see a half written file
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def read_parquet(path, columns=None):
+    '''
+    Memory-map a Parquet file, reading only the columns listed (that it has)
+    '''
+    if columns is not None:
+        names = set(pq.read_schema(path).names)
+        columns = [column for column in columns if column in names]
+    return pq.read_table(path, columns=columns, memory_map=True).to_pandas()
+
+
+def load_workbook(excel_file, sheets, digest=None, columns=None, types=None):
+    '''
+    Load every sheet in sheets ({sheet name: header row}) from the workbook,
+    parsing the Excel file at most once. Parsed sheets are cached as Parquet
+    keyed by the SHA of the file, so reruns and re-uploads of the same file
+    memory-map the cached columns instead of parsing the xlsx again (the
+    cache is kept under cache_limit, see prune_cache). Sheets
+    the workbook doesn't have are left out of the result.
+    columns ({sheet name: [column]}) limits a sheet to the columns listed,
+    and types ({sheet name: {column: type}}) stores columns compactly, see compact
+    '''
+    if digest is None:
+        digest = file_hash(excel_file)
+    columns = columns or {}
+    types = types or {}
+    key = (digest, repr(sorted(sheets.items())), repr(sorted(columns.items())), repr(sorted(types.items())))
+    profiler = profiling.current()
+    if key in _loaded:
+        profiler.cache_hit('workbook memory')
+        return _loaded[key]
+    profiler.cache_miss('workbook memory')
+    paths = {sheet: _sheet_path(digest, sheet, header) for sheet, header in sheets.items()}
+
+    frames = {}
+    missing = [sheet for sheet in sheets if not os.path.exists(paths[sheet])]
+    if missing:
+        profiler.cache_miss('workbook parquet', len(missing))
+        if hasattr(excel_file, 'seek'):
+            excel_file.seek(0)
+        with profiling.section('parse excel') as record, pd.ExcelFile(excel_file) as workbook:  # one parse for all sheets
+            missing = [sheet for sheet in missing if sheet in workbook.sheet_names]
+            for sheet in missing:
+                frames[sheet] = compact(to_arrow_safe(workbook.parse(sheet, header=sheets[sheet])), types.get(sheet, {}))
+            record['rows'] = sum(len(frames[sheet]) for sheet in missing)
+        for sheet in missing:
+            try:
+                write_parquet(frames[sheet], paths[sheet])
+            except (OSError, pa.ArrowException):
+                pass  # read-only disk or unstorable column, the frame is still usable
+            if sheet in columns:
+                frames[sheet] = frames[sheet][[column for column in columns[sheet] if column in frames[sheet]]]
+        try:
+            prune_cache(keep=digest)
+        except OSError:
+            pass  # another process pruning at the same time
+
+    cached = [sheet for sheet in sheets if sheet not in frames and os.path.exists(paths[sheet])]
+    if cached:
+        profiler.cache_hit('workbook parquet', len(cached))
+        try:
+            os.utime(os.path.join(cache_dir, digest))  # used now, pruned last
+        except OSError:
+            pass
+        with profiling.section('read parquet') as record:
+            for sheet in cached:
+                # sheets cached before their types were given are converted as they are read
+                frames[sheet] = compact(read_parquet(paths[sheet], columns.get(sheet)), types.get(sheet, {}))
+            record['rows'] = sum(len(frames[sheet]) for sheet in cached)
+
+    if len(_loaded) >= _max_loaded:
+        _loaded.pop(next(iter(_loaded)))
+    _loaded[key] = frames
+    return frames
@@ -0,0 +1,55 @@
+import string
+from collections import Counter
+from itertools import islice
+
+import pandas as pd
+
+from profiling import profiled
+
+# common words banned from being used in relevancy analysis
+stop_words = frozenset([
+    "how", "food", "to", "i", "and", "of", "eat", "that", "a", "with", "use", "in", "can", "eating", "you", "more",
+    "the", "not", "is", "all", "be", "about", "are", "cook", "cooking", "foods", "using", "without", "as", "good",
+    "have", "it", "my", "for", "learned", "meals", "prepare", "recipes", "them", "ways", "make", "try", "way", "what",
+    "your"])
+
+_strip_punctuation = str.maketrans('', '', string.punctuation)
+
+
+def tokenize(text):
+    '''
+    Split a response into lower case words with the punctuation removed
+    '''
+    return str(text).translate(_strip_punctuation).lower().split()
+
+
+def keywords(tokens, n=1, stop_words=stop_words):
+    '''
+    Yield the single words (n=1) or runs of n neighbouring words of a
+    tokenized response, skipping any that contain a stop word
+    '''
+    if n == 1:
+        yield from (token for token in tokens if token not in stop_words)
+        return
+    runs = zip(*(islice(tokens, i, None) for i in range(n)))
+    yield from (' '.join(run) for run in runs if not stop_words.intersection(run))
+
+
+@profiled('count keywords')
+def count_keywords(responses, n=1, stop_words=stop_words):
+    '''
+    Count how often each keyword appears over all the responses, in one
+    pass over the text. Blank (NaN) responses are ignored
+    '''
+    counts = Counter()
+    for response in responses:
+        if not pd.isna(response):
+            counts.update(keywords(tokenize(response), n, stop_words))
+    return counts
+
+
+def top_keywords(responses, k=15, n=1, stop_words=stop_words):
+    '''
+    The k most frequent keywords as {keyword: count}, most frequent first
+    '''
+    return dict(count_keywords(responses, n, stop_words).most_common(k))
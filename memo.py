@@ -0,0 +1,56 @@
+import threading
+from collections import OrderedDict
+
+import profiling
+
+max_results = 64  # results kept per process, the least recently used are dropped first
+
+
+class LRUCache:
+    '''
+    Results of the app's sections keyed by (section, upload hash, filter
+    state, view options), shared by every session of the process. Only the
+    maxsize most recently used results are kept. Results are shared, so
+    they must not be modified
+    '''
+
+    def __init__(self, maxsize=max_results):
+        self.maxsize = maxsize
+        self._results = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._results)
+
+    def get(self, key, compute):
+        '''
+        The result stored for key, or compute() stored as it. The first item
+        of key names the cache in the profiler
+        '''
+        with self._lock:
+            if key in self._results:
+                self._results.move_to_end(key)
+                profiling.current().cache_hit(key[0])
+                return self._results[key]
+        profiling.current().cache_miss(key[0])
+        result = compute()  # outside the lock, other sessions don't wait for it
+        with self._lock:
+            self._results[key] = result
+            self._results.move_to_end(key)
+            while len(self._results) > self.maxsize:
+                self._results.popitem(last=False)
+        return result
+
+    def clear(self):
+        with self._lock:
+            self._results.clear()
+
+
+results = LRUCache()
+
+
+def memoize(key, compute):
+    '''
+    compute() memoized by key in the process wide LRUCache
+    '''
+    return results.get(key, compute)
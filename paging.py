@@ -0,0 +1,62 @@
+import math
+
+import pandas as pd
+
+payload_budget = 2 * 2 ** 20  # bytes of table data sent to the browser per run of the app
+page_bytes = 256 * 2 ** 10  # bytes of one page of a table
+page_rows = 100  # rows per page of tables with small rows
+min_page_rows = 10  # rows per page of tables with big rows, and rows sent however little budget is left
+
+
+def row_bytes(frame, sample=1000):
+    '''
+    Average size of a row of frame in bytes, estimated from its first rows
+    '''
+    if not len(frame):
+        return 0
+    head = frame.head(sample)
+    if isinstance(head, pd.Series):
+        head = head.to_frame()
+    usage = head.memory_usage(deep=True, index=True)
+    return math.ceil(usage.sum() / len(head))
+
+
+def page_count(rows, size):
+    return max(math.ceil(rows / size), 1)
+
+
+def page_size(frame, rows=page_rows):
+    '''
+    Rows per page of frame, from the size of its own rows only so pages
+    don't move when other tables change
+    '''
+    return max(min(rows, page_bytes // (row_bytes(frame) or 1)), min_page_rows)
+
+
+def page(frame, number, size):
+    '''
+    Rows of page number (counting from 0) of frame, size rows per page
+    '''
+    return frame.iloc[number * size:(number + 1) * size]
+
+
+class PayloadBudget:
+    '''
+    How many bytes of table data the app may still send this run. Pages
+    are sent whole while the budget lasts, once it runs out only their
+    first min_page_rows rows are
+    '''
+
+    def __init__(self, total=payload_budget):
+        self.total = total
+        self.remaining = total
+
+    def take(self, chunk):
+        '''
+        The rows of a page that fit in the remaining budget (at least
+        min_page_rows), taking their size off the budget
+        '''
+        size = row_bytes(chunk) or 1
+        chunk = chunk.iloc[:max(self.remaining // size, min_page_rows)]
+        self.remaining = max(self.remaining - size * len(chunk), 0)
+        return chunk
@@ -0,0 +1,151 @@
+import functools
+import json
+import threading
+import time
+import tracemalloc
+from collections import defaultdict
+from contextlib import contextmanager
+
+_local = threading.local()  # streamlit runs every session in its own thread
+_tracing = 0  # open profilers tracing memory, tracemalloc is stopped when the last one closes
+_started_tracing = False  # whether tracemalloc was started here rather than by e.g. python -X tracemalloc
+_tracing_lock = threading.Lock()
+
+
+class Profiler:
+    '''
+    Wall time, peak memory (tracemalloc) and row counts of named sections,
+    plus hit/miss counts of the caches, for one run of the app or a workbook.
+    Does nothing unless enabled, so it can stay in the hot paths. Tracing
+    memory slows Python code down several times, so it is a separate switch,
+    and it only lasts until the profiler is closed. tracemalloc traces the
+    whole process: peaks are per process, not per session, so sessions
+    profiling at the same time see each other's allocations and peak resets
+    '''
+
+    def __init__(self, enabled=False, trace_memory=False):
+        self.enabled = enabled
+        self.trace_memory = enabled and trace_memory
+        self.sections = []
+        self.caches = defaultdict(lambda: {'hits': 0, 'misses': 0})
+        self._stack = []  # peaks of the sections currently open, innermost last
+        if self.trace_memory:
+            global _tracing, _started_tracing
+            with _tracing_lock:
+                if not tracemalloc.is_tracing():
+                    tracemalloc.start()
+                    _started_tracing = True
+                _tracing += 1
+
+    def close(self):
+        '''
+        Stop tracing memory for this profiler, tracemalloc itself stops once
+        no open profiler traces memory
+        '''
+        if not self.trace_memory:
+            return
+        global _tracing, _started_tracing
+        self.trace_memory = False
+        with _tracing_lock:
+            _tracing -= 1
+            if not _tracing and _started_tracing:
+                tracemalloc.stop()
+                _started_tracing = False
+
+    @contextmanager
+    def section(self, name, rows=None):
+        '''
+        Time the body. The yielded record can be given the number of 'rows'
+        the section worked on
+        '''
+        record = {'section': name, 'rows': rows}
+        if not self.enabled:
+            yield record
+            return
+        if self.trace_memory:
+            current, peak = tracemalloc.get_traced_memory()
+            if self._stack:  # keep what the enclosing section reached before resetting its peak
+                self._stack[-1] = max(self._stack[-1], peak)
+            tracemalloc.reset_peak()
+            start_memory = current
+            self._stack.append(0)
+        start = time.perf_counter()
+        try:
+            yield record
+        finally:
+            record['seconds'] = time.perf_counter() - start
+            record['peak_bytes'] = None
+            if self.trace_memory:
+                # peak since the last reset, or of a nested section, whichever is higher
+                peak = max(tracemalloc.get_traced_memory()[1], self._stack.pop())
+                record['peak_bytes'] = max(peak - start_memory, 0)
+                if self._stack:
+                    self._stack[-1] = max(self._stack[-1], peak)
+                tracemalloc.reset_peak()
+            self.sections.append(record)
+
+    def cache_hit(self, cache, count=1):
+        if self.enabled:
+            self.caches[cache]['hits'] += count
+
+    def cache_miss(self, cache, count=1):
+        if self.enabled:
+            self.caches[cache]['misses'] += count
+
+    def records(self, **extra):
+        '''
+        Every section and cache as a flat dict, with the extra fields added
+        '''
+        records = [dict(record, **extra) for record in self.sections]
+        records += [dict(cache=cache, **counts, **extra) for cache, counts in self.caches.items()]
+        return records
+
+    def to_jsonl(self, **extra):
+        return ''.join(json.dumps(record, default=str) + '\n' for record in self.records(**extra))
+
+    def export(self, path, **extra):
+        '''
+        Append the records as JSON lines to path
+        '''
+        with open(path, 'a') as f:
+            f.write(self.to_jsonl(**extra))
+
+
+def start(enabled=True, trace_memory=False):
+    '''
+    Give the current thread a new Profiler and return it, closing the one it had
+    '''
+    previous = getattr(_local, 'profiler', None)
+    if previous is not None:
+        previous.close()
+    _local.profiler = Profiler(enabled, trace_memory)
+    return _local.profiler
+
+
+def current():
+    '''
+    The Profiler of the current thread, a disabled one if start wasn't called
+    '''
+    profiler = getattr(_local, 'profiler', None)
+    if profiler is None:
+        profiler = _local.profiler = Profiler()
+    return profiler
+
+
+def section(name, rows=None):
+    return current().section(name, rows)
+
+
+def profiled(name):
+    '''
+    Decorator timing every call of the function as a section, with the
+    length of its first argument (usually a frame) as the rows
+    '''
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            rows = len(args[0]) if args and hasattr(args[0], '__len__') else None
+            with section(name, rows):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorator
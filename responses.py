@@ -0,0 +1,42 @@
+from profiling import profiled
+
+recipes_column = "Most useful thing you learned in this program/What recipes were most interesting to you?"
+qualitative_columns = [recipes_column,
+                       "Biggest Obstacle To Healthy Eating",
+                       '"African Heritage Foods" Defined After Taking This Class/What surprised you most about the classes, recipes or African heritage foods? ',
+                       "Change Anything?",
+                       "Cook any recipes at home?/If didn't why?",
+                       "Changed the way you eat?",
+                       "Other Comments:"]
+
+# answers that don't really answer the question, compared after lower casing and trimming
+stop_responses = {
+    "Biggest Obstacle To Healthy Eating": {'no response', 'not sure', 'nothing', 'none'},
+    "Change Anything?": {'none', 'no', 'nothing', 'no response'},
+    "Cook any recipes at home?/If didn't why?": {'no', 'not yet', 'no response'},
+    "Other Comments:": {'none', 'no', 'nothing'},
+}
+
+
+def normalize(responses):
+    '''
+    Lower case and trim the responses so they can be compared as text
+    '''
+    return responses.astype(str).str.strip().str.lower()
+
+
+@profiled('clean responses')
+def clean_responses(df, columns=qualitative_columns):
+    '''
+    The answers to each qualitative question with the blanks and the
+    question's stop responses removed, as {column: Series} keeping the
+    row index of df
+    '''
+    cleaned = {}
+    for column in columns:
+        responses = df[column].dropna()
+        stop = stop_responses.get(column)
+        if stop:
+            responses = responses[~normalize(responses).isin(stop)]
+        cleaned[column] = responses
+    return cleaned
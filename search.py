@@ -0,0 +1,114 @@
+import bisect
+
+import numpy as np
+import pandas as pd
+
+from keywords import tokenize
+from profiling import section
+
+
+class ResponseIndex:
+    '''
+    Inverted index of the qualitative responses ({column: Series}, e.g. from
+    clean_responses), tokenized like the keyword charts. Every word maps to
+    the responses it appears in and how often, stored as one sorted array
+    per field so a query only slices arrays. Matches are ranked with BM25
+    '''
+    k1 = 1.2  # how quickly repeating a word stops adding to the score
+    b = 0.75  # how much long responses are penalized
+
+    def __init__(self, responses):
+        with section('build search index') as record:
+            self._build(responses)
+            record['rows'] = len(self)
+
+    def _build(self, responses):
+        self.columns = list(responses)
+        rows, questions, texts = [], [], []
+        for question, (column, answers) in enumerate(responses.items()):
+            answers = answers.dropna()
+            rows.extend(answers.index)
+            questions.extend([question] * len(answers))
+            texts.extend(answers)
+        self.rows = pd.Index(rows)  # survey row of every response
+        self.questions = np.array(questions, dtype=np.int32)
+        self.texts = np.array(texts, dtype=object)
+
+        tokens, documents = [], []
+        lengths = np.zeros(len(texts), dtype=np.int32)
+        for document, text in enumerate(texts):
+            words = tokenize(text)
+            tokens.extend(words)
+            documents.extend([document] * len(words))
+            lengths[document] = len(words)
+        self.lengths = lengths
+        self.average_length = lengths.mean() if len(lengths) else 0.0
+
+        codes, vocabulary = pd.factorize(pd.Series(tokens, dtype=object), sort=True)
+        self.vocabulary = list(vocabulary)
+        # one (word, response) pair per posting, sorted by word then response
+        pairs, counts = np.unique(codes.astype(np.int64) * max(len(texts), 1) + np.array(documents, dtype=np.int64),
+                                  return_counts=True)
+        words = pairs // max(len(texts), 1)
+        self.documents = (pairs % max(len(texts), 1)).astype(np.int32)
+        self.frequencies = counts.astype(np.int32)
+        self.starts = np.searchsorted(words, np.arange(len(self.vocabulary) + 1))
+
+    def __len__(self):
+        return len(self.texts)
+
+    def _word_range(self, term):
+        '''
+        Positions in the vocabulary of the words term matches: itself, or every
+        word starting with it when it ends with '*'
+        '''
+        if term.endswith('*'):
+            prefix = term[:-1]
+            return bisect.bisect_left(self.vocabulary, prefix), bisect.bisect_left(self.vocabulary, prefix + '\uffff')
+        start = bisect.bisect_left(self.vocabulary, term)
+        return start, start + (start < len(self.vocabulary) and self.vocabulary[start] == term)
+
+    def _term_scores(self, term):
+        '''
+        BM25 score of term in every response, 0 where it doesn't appear
+        '''
+        first, last = self._word_range(term)
+        postings = slice(self.starts[first], self.starts[last])
+        documents = self.documents[postings]
+        frequencies = np.bincount(documents, weights=self.frequencies[postings], minlength=len(self))
+        matches = np.count_nonzero(frequencies)
+        if not matches:
+            return frequencies
+        idf = np.log(1 + (len(self) - matches + 0.5) / (matches + 0.5))
+        norm = self.k1 * (1 - self.b + self.b * self.lengths / (self.average_length or 1))
+        return idf * frequencies * (self.k1 + 1) / (frequencies + norm)
+
+    def search(self, query, rows=None, columns=None, limit=50):
+        '''
+        Responses containing every word of query (words ending in '*' match
+        any word they start with), best matches first, as a frame indexed by
+        survey row with the Question, Response and Score. rows limits the
+        search to those survey rows (e.g. the filtered students) and columns
+        to those questions
+        '''
+        terms = [term + '*' if raw.endswith('*') else term
+                 for raw in query.split() for term in tokenize(raw.rstrip('*'))]
+        with section('search responses', len(self)) as record:
+            scores = np.zeros(len(self))
+            found = np.ones(len(self), dtype=bool)
+            for term in terms:
+                term_scores = self._term_scores(term)
+                found &= term_scores > 0
+                scores += term_scores
+            if not terms:
+                found[:] = False
+            if rows is not None:
+                found &= self.rows.isin(rows)
+            if columns is not None:
+                found &= np.isin(self.questions, [self.columns.index(column) for column in columns])
+            matches = np.flatnonzero(found)
+            best = matches[np.argsort(-scores[matches], kind='stable')[:limit]]
+            record['matches'] = len(matches)
+        return pd.DataFrame({'Question': [self.columns[question] for question in self.questions[best]],
+                             'Response': self.texts[best], 'Score': scores[best]},
+                            index=self.rows[best])
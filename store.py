@@ -0,0 +1,225 @@
+import glob
+import json
+import os
+import threading
+
+import pandas as pd
+import pyarrow as pa
+
+from analysis import bp_sheet_name, sheet_name, sheets, waist_sheet_name, weight_sheet_name
+from cube import build_cube, cube_keys, heritage_column, merge_cubes
+from health import health_counts, health_summary
+from improvements import post_columns, pre_answer_columns, pre_columns
+from ingest import read_parquet, to_arrow_safe, write_parquet
+from profiling import profiled
+from responses import qualitative_columns
+from teachers import rank_counts
+
+store_dir = '.oldways_store'  # Where the accumulated students are kept
+aggregates_version = 2  # raised when the kept aggregates change, older ones are rebuilt from the stored rows
+
+# the columns that tell one student's row from another, per sheet. The health sheets identify their students, the
+# survey has no student ID so a row is told apart by all of its answers
+identity_columns = ['Location', 'Name', 'Student']
+key_columns = {
+    sheet_name: cube_keys + pre_answer_columns + pre_columns + post_columns + [heritage_column] + qualitative_columns,
+    weight_sheet_name: identity_columns,
+    bp_sheet_name: identity_columns,
+    waist_sheet_name: identity_columns,
+}
+health_sheets = [weight_sheet_name, bp_sheet_name, waist_sheet_name]
+
+
+def row_keys(df, columns):
+    '''
+    Stable key of every row, from its values in columns (compared as text so
+    a column turning from int to float in a later export doesn't matter) plus
+    how many identical rows came before it, so two students who answered
+    the same way stay two students
+    '''
+    values = df.reindex(columns=columns)
+    for column in values.columns:
+        if pd.api.types.is_numeric_dtype(values[column]):
+            values[column] = values[column].astype(float)
+    content = pd.util.hash_pandas_object(values.astype(str), index=False)
+    occurrence = content.groupby(content).cumcount()
+    return pd.util.hash_pandas_object(pd.DataFrame({'content': content, 'occurrence': occurrence}), index=False)
+
+
+def _safe_name(name):
+    return ''.join(c if c.isalnum() else '_' for c in name)
+
+
+def _save_wide(frame, path):
+    flat = frame.copy()
+    flat.columns = ['|'.join(column) for column in frame.columns]
+    write_parquet(flat.reset_index(), path)
+
+
+def _load_wide(path, keys):
+    flat = read_parquet(path).set_index(keys)
+    flat.columns = pd.MultiIndex.from_tuples([tuple(column.split('|')) for column in flat.columns])
+    return flat
+
+
+class StudentStore:
+    '''
+    Append-only store of every student seen in any uploaded workbook. Each
+    ingest only appends the rows not stored yet (as a new Parquet part per
+    sheet) and adds their counts to the kept aggregates: the survey cube, which
+    the topic counts, teacher ranking and class locations come from, and
+    the health counts by sex.
+    Health rows are told apart by the student (Location, Name, Student), so
+    a later export that corrects a value adds nothing (the value first
+    stored is kept). The survey has no student ID, its rows are told apart
+    by all their answers: a survey row edited between exports is stored,
+    and counted, twice
+    '''
+
+    def __init__(self, path=store_dir):
+        self.path = path
+        self._lock = threading.Lock()
+        self._frames = {}
+        self._keys = {}
+        for sheet in sheets:
+            parts = sorted(glob.glob(os.path.join(path, _safe_name(sheet), 'part-*.parquet')))
+            frame = pd.concat([read_parquet(part) for part in parts], ignore_index=True) if parts else None
+            if frame is not None:
+                frame = frame.drop(columns='_key', errors='ignore')  # kept in the parts of older versions
+            # computed from the stored rows rather than kept with them, so they follow changes to key_columns
+            self._keys[sheet] = set() if frame is None else set(row_keys(frame, key_columns[sheet]))
+            self._frames[sheet] = frame
+
+        state_path = os.path.join(path, 'state.json')
+        state = {}
+        if os.path.exists(state_path):
+            with open(state_path) as f:
+                state = json.load(f)
+        self.workbooks = set(state.get('workbooks', []))
+        health_path = os.path.join(path, 'health.parquet')
+        has_health = any(self._frames[sheet] is not None for sheet in health_sheets)
+        if state.get('version') == aggregates_version and state.get('rows') == self.rows() and \
+                os.path.exists(os.path.join(path, 'cube.parquet')) and os.path.exists(health_path) == has_health:
+            self.cube = _load_wide(os.path.join(path, 'cube.parquet'), cube_keys)
+            self.health = _load_wide(health_path, 'Sex') if has_health else None
+        else:  # first run, stopped between writing a part and the aggregates, or stored by an older version
+            self.cube = None
+            self.health = None
+            self._add_aggregates({sheet: frame for sheet, frame in self._frames.items() if frame is not None})
+            if any(self.rows().values()):
+                self._save_state()
+
+    def rows(self):
+        '''
+        Number of stored rows of each sheet
+        '''
+        return {sheet: 0 if frame is None else len(frame) for sheet, frame in self._frames.items()}
+
+    @property
+    def version(self):
+        '''
+        Changes whenever new rows are stored, for keying caches
+        '''
+        return 'store-' + '-'.join(str(count) for count in self.rows().values())
+
+    def frames(self):
+        '''
+        All the stored rows of every sheet, like load_workbook returns them
+        '''
+        return {sheet: frame for sheet, frame in self._frames.items() if frame is not None}
+
+    def _add_aggregates(self, new_rows):
+        if new_rows.get(sheet_name) is not None and len(new_rows[sheet_name]):
+            cube = build_cube(new_rows[sheet_name])
+            self.cube = cube if self.cube is None else merge_cubes(self.cube, cube)
+        health = [new_rows.get(sheet) for sheet in health_sheets]
+        if any(frame is not None and len(frame) for frame in health):
+            counts = health_counts(*(pd.DataFrame(columns=key_columns[sheet]) if frame is None else frame
+                                     for sheet, frame in zip(health_sheets, health)), by='Sex')
+            self.health = counts if self.health is None else self.health.add(counts, fill_value=0)
+
+    def _save_state(self):
+        os.makedirs(self.path, exist_ok=True)
+        if self.cube is not None:
+            _save_wide(self.cube, os.path.join(self.path, 'cube.parquet'))
+        if self.health is not None:
+            _save_wide(self.health, os.path.join(self.path, 'health.parquet'))
+        state = {'version': aggregates_version, 'workbooks': sorted(self.workbooks), 'rows': self.rows()}
+        tmp_path = os.path.join(self.path, f'state.json.{os.getpid()}.tmp')
+        with open(tmp_path, 'w') as f:
+            json.dump(state, f)
+        os.replace(tmp_path, os.path.join(self.path, 'state.json'))
+
+    @profiled('ingest into store')
+    def ingest(self, frames, digest=None):
+        '''
+        Add the rows of frames ({sheet: frame}, e.g. from load_workbook) that
+        aren't stored yet. Returns how many new rows each sheet got. Raises
+        OSError (or an ArrowException) and stores nothing if the new rows
+        can't be written
+        '''
+        with self._lock:
+            if digest is not None and digest in self.workbooks:
+                return {sheet: 0 for sheet in frames}
+            new_rows, new_keys = {}, {}
+            for sheet, frame in frames.items():
+                if sheet not in key_columns:
+                    continue
+                keys = row_keys(frame, key_columns[sheet])
+                unseen = ~keys.isin(self._keys[sheet]).to_numpy()
+                if unseen.any():
+                    new_rows[sheet] = to_arrow_safe(frame[unseen])
+                    new_keys[sheet] = keys[unseen]
+
+            # every part lands or none do, rows only in memory would be lost (and never added again) on restart
+            written = []
+            try:
+                for sheet, new in new_rows.items():
+                    part = len(glob.glob(os.path.join(self.path, _safe_name(sheet), 'part-*.parquet')))
+                    path = os.path.join(self.path, _safe_name(sheet), f'part-{part:05d}.parquet')
+                    write_parquet(new, path)
+                    written.append(path)
+            except (OSError, pa.ArrowException):
+                for path in written:
+                    try:
+                        os.remove(path)
+                    except OSError:
+                        pass
+                raise
+
+            for sheet, new in new_rows.items():
+                self._keys[sheet].update(new_keys[sheet])
+                self._frames[sheet] = new if self._frames[sheet] is None else \
+                    pd.concat([self._frames[sheet], new], ignore_index=True)
+            self._add_aggregates(new_rows)
+            if digest is not None:
+                self.workbooks.add(digest)
+            try:
+                self._save_state()
+            except (OSError, pa.ArrowException):
+                pass
+            return {sheet: len(new_rows.get(sheet, ())) for sheet in frames}
+
+    def health_statistics(self):
+        return None if self.health is None else health_summary(self.health)
+
+    def rank_teachers(self, keys=('Teacher Name',)):
+        '''
+        Teacher ranking of every stored student, from the cube
+        '''
+        return rank_counts(self.cube.groupby(level=list(keys), sort=False, observed=True).sum())
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_student_store():
+    '''
+    The process wide StudentStore
+    '''
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = StudentStore()
+    return _store
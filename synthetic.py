@@ -0,0 +1,145 @@
+'''
+Write made up workbooks laid out like the real Oldways export, for trying
+the app and benchmarking it without sharing student data:
+
+    python synthetic.py synthetic.xlsx --students 100000
+'''
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from analysis import bp_sheet_name, sheet_name, sheets, waist_sheet_name, weight_sheet_name
+from health import stage_labels
+from improvements import topics
+from responses import qualitative_columns
+
+class_types = ['A Taste of African Heritage', 'Cooking Demo', 'Tasting']
+location_types = ['Church', 'Community Center', 'School', 'Library', 'Clinic']
+places = ['Fayetteville, NC', 'Plymouth, NC', 'Baltimore, MD', 'Philadelphia, PA', 'Houston, TX', 'Brooklyn, NY',
+          'Danville, VA', 'Detroit, MI', 'St. Louis, MO', 'Atlanta, GA', 'Oakland, CA', 'Chicago, IL']
+answers = ['Never', 'Rarely', 'Sometimes', 'Often', 'Always']  # Pre/Post text, numbered 1 to 5
+words = ['greens', 'spices', 'herbs', 'beans', 'rice', 'sweet', 'potatoes', 'collard', 'okra', 'salad', 'less',
+         'salt', 'sugar', 'time', 'money', 'family', 'cook', 'more', 'vegetables', 'fruit', 'whole', 'grains',
+         'the', 'and', 'to', 'i', 'learned', 'how', 'healthy', 'different', 'new', 'ways', 'of', 'eating']
+non_answers = ['none', 'No response', 'Nothing', 'not sure', 'no', 'Not yet']
+
+
+def _sentences(rng, count, blank=0.2):
+    lengths = rng.integers(1, 12, count)
+    vocabulary = np.array(words, dtype=object)
+    sentences = [' '.join(vocabulary[rng.integers(0, len(words), n)]) + '.' for n in lengths]
+    sentences = np.array(sentences, dtype=object)
+    roll = rng.random(count)
+    sentences[roll < 0.05] = rng.choice(non_answers, (roll < 0.05).sum())
+    sentences[roll > 1 - blank] = None
+    return sentences
+
+
+def survey_frame(students, rng):
+    '''
+    The Student Lifestyle Surveys sheet, with the repeated Pre/Post headers
+    the real export has
+    '''
+    n_classes = max(1, students // 12)
+    n_teachers = max(1, n_classes // 4)
+    student_class = np.sort(rng.integers(0, n_classes, students))
+    class_teacher = rng.integers(0, n_teachers, n_classes)[student_class]
+    class_place = np.array(places, dtype=object)[rng.integers(0, len(places), n_classes)][student_class]
+
+    columns = [('Class Type', rng.choice(class_types, n_classes)[student_class]),
+               ('Teacher Name', np.array([f'Teacher {t}' for t in range(n_teachers)], dtype=object)[class_teacher]),
+               ('Class End Date (year)', rng.integers(2013, 2021, n_classes)[student_class]),
+               ('Class Location Type', rng.choice(location_types, n_classes)[student_class]),
+               ('City', [place.split(', ')[0] for place in class_place]),
+               ('State', [place.split(', ')[1] for place in class_place]),
+               ('Location', None),
+               ('Participants', rng.integers(4, 20, n_classes)[student_class])]
+    text = np.array(answers, dtype=object)
+    for _ in topics:
+        pre = rng.integers(1, 6, students)
+        post = np.clip(pre + rng.integers(-1, 3, students), 1, 5)
+        missing = rng.random(students) < 0.03
+        columns += [('Pre', np.where(missing, None, text[pre - 1])),
+                    ('Pre - Num', np.where(missing, np.nan, pre)),
+                    ('Post', np.where(missing, None, text[post - 1])),
+                    ('Post Num', np.where(missing, np.nan, post)),
+                    ('Follow-up', None)]
+    columns.append(('History & Heritage Positive Motivators?',
+                    rng.choice(np.array(['Yes', 'yes', 'No', None], dtype=object), students, p=[.7, .1, .05, .15])))
+    columns += [(column, _sentences(rng, students)) for column in qualitative_columns]
+
+    df = pd.DataFrame({i: values for i, (_, values) in enumerate(columns)}, index=range(students))
+    df.columns = [name for name, _ in columns]
+    return df
+
+
+def _stage(sys, dia):
+    '''
+    HPB stage number (see health.stage_labels) of blood pressures
+    '''
+    return np.select([(sys >= 140) | (dia >= 90), (sys >= 130) | (dia >= 80), sys >= 120], [4, 3, 2], 1)
+
+
+def health_frames(students, rng):
+    '''
+    The weight, blood pressure and waist sheets for about half of the students
+    '''
+    n = max(1, students // 2)
+    people = pd.DataFrame({'Location': rng.choice(places, n), 'Name': [f'Student {i}' for i in range(n)],
+                           'Student': np.arange(1, n + 1), 'Sex': rng.choice(['F', 'M'], n, p=[.8, .2])})
+
+    start_weight = rng.normal(200, 35, n).round(1)
+    end_weight = (start_weight - rng.normal(3, 5, n)).round(1)
+    weight = people.assign(**{'Starting Weight': start_weight, 'Ending Weight': end_weight,
+                              'Weight Change lbs.': (start_weight - end_weight).round(1)})
+    weight.insert(0, 'Class Type', rng.choice(class_types, n))
+
+    start_sys, start_dia = rng.normal(135, 15, n).round(), rng.normal(85, 10, n).round()
+    end_sys, end_dia = (start_sys - rng.normal(4, 8, n)).round(), (start_dia - rng.normal(2, 6, n)).round()
+    start_stage, end_stage = _stage(start_sys, start_dia), _stage(end_sys, end_dia)
+    rating = np.select([end_stage < start_stage, end_stage == start_stage], ['Decrease', 'No Change'], 'Increase')
+    # the stages sit in unlabelled columns, their name first and then their number
+    bp_columns = [('', None), ('Location', people['Location']), ('Name', people['Name']),
+                  ('Student', people['Student']), ('Sex', people['Sex']),
+                  ('Starting Sys BP', start_sys), ('Starting Dia BP', start_dia),
+                  ('', [stage_labels[stage] for stage in start_stage]), ('', start_stage),
+                  ('Ending Sys BP', end_sys), ('Ending Dia BP', end_dia),
+                  ('', [stage_labels[stage] for stage in end_stage]), ('', end_stage),
+                  ('Change in Sys BP', start_sys - end_sys), ('Change in Dia BP', start_dia - end_dia),
+                  ('Change in New HPB Rating', rating)]
+    bp = pd.DataFrame({i: values for i, (_, values) in enumerate(bp_columns)}, index=people.index)
+    bp.columns = [name for name, _ in bp_columns]
+
+    start_waist = rng.normal(40, 5, n).round(1)
+    end_waist = (start_waist - rng.normal(1, 1.5, n)).round(1)
+    waist = people.assign(**{'Starting WC': start_waist, 'Ending WC': end_waist,
+                             'Inches Lossed': (start_waist - end_waist).round(1)})
+    return weight, bp, waist
+
+
+def generate_workbook(path, students, seed=0):
+    '''
+    Write a workbook with the given number of surveyed students to path
+    '''
+    rng = np.random.default_rng(seed)
+    weight, bp, waist = health_frames(students, rng)
+    frames = {sheet_name: survey_frame(students, rng), weight_sheet_name: weight, bp_sheet_name: bp,
+              waist_sheet_name: waist}
+    with pd.ExcelWriter(path) as writer:
+        for name, frame in frames.items():
+            frame.to_excel(writer, sheet_name=name, startrow=sheets[name], index=False)
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Write a synthetic Oldways workbook.')
+    parser.add_argument('path', help='where to write the .xlsx file')
+    parser.add_argument('--students', type=int, default=1000, help='number of surveyed students')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    generate_workbook(args.path, args.students, args.seed)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,28 @@
+import numpy as np
+import pandas as pd
+
+from improvements import grouped_topic_counts
+from profiling import profiled
+
+group_options = ['Class End Date (year)', 'Class Type', 'State']  # Extra keys teachers can be broken down by
+
+
+@profiled('rank teachers')
+def rank_teachers(df, keys=('Teacher Name',)):
+    '''
+    Rank teachers (or any other grouping) by the average % of their students
+    that increased across the topics, best first
+    '''
+    return rank_counts(grouped_topic_counts(df, list(keys)))
+
+
+def rank_counts(counts):
+    '''
+    Rank the groups of grouped topic counts (from grouped_topic_counts, or
+    summed cube cells) by their average % increase, best first
+    '''
+    increase = 100 * counts['Increased'] / counts['Total'].replace(0, np.nan)  # NaN for unanswered topics
+    ranking = pd.DataFrame({'Average % Increase': increase.mean(axis=1),
+                            'Average # of Students': counts['Total'].mean(axis=1)})
+    ranking = ranking.reset_index()
+    return ranking.sort_values('Average % Increase', ascending=False, kind='stable', ignore_index=True)
@@ -0,0 +1,25 @@
+'''
+Correctness tests over small synthetic workbooks. Run from the repository root:
+
+    python -m pytest tests
+'''
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import ingest  # noqa: E402
+from analysis import sheet_types, sheets  # noqa: E402
+from synthetic import generate_workbook  # noqa: E402
+
+
+@pytest.fixture(scope='session')
+def workbook(tmp_path_factory):
+    '''
+    Every sheet of a 300 student synthetic workbook, loaded like the app loads it
+    '''
+    directory = tmp_path_factory.mktemp('workbook')
+    ingest.cache_dir = str(directory / 'cache')
+    return ingest.load_workbook(generate_workbook(str(directory / 'students.xlsx'), 300), sheets, types=sheet_types)
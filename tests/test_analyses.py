@@ -0,0 +1,108 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from analysis import bp_sheet_name, health_statistics, sheet_name, waist_sheet_name, weight_sheet_name
+from cube import build_cube, heritage_counts
+from health import health_counts, health_table, statistic
+from improvements import get_df_percentages, topic_columns, topic_counts, topics
+from teachers import rank_teachers
+
+
+def original_topic_counts(df):
+    '''
+    (increased, same, answered) of every topic, the way the original app counted them
+    '''
+    counts = []
+    for i in range(len(topics)):
+        pre_string, pre_name, post_name = topic_columns(i)
+        pre_post = df[[pre_name, post_name, pre_string]].copy()
+        pre_post['Difference'] = pre_post[post_name] - pre_post[pre_name]
+        pre_post = pre_post.dropna()  # drops the blank lines (they didn't answer)
+        counts.append((len(pre_post[pre_post['Difference'] > 0]), len(pre_post[pre_post['Difference'] == 0]),
+                       len(pre_post)))
+    return counts
+
+
+@pytest.fixture
+def survey(workbook):
+    df = workbook[sheet_name].copy()
+    # a pre answer left blank with its numbers filled in, the original app left such rows out
+    df['Pre'] = df['Pre'].astype(object)
+    df.loc[df.index[:5], 'Pre'] = np.nan
+    return df
+
+
+def test_topic_counts_leave_out_blank_pre_answers(survey):
+    counts = topic_counts(survey)
+    assert [tuple(row) for row in counts[['Increased', 'No Change', 'Total']].to_numpy()] == \
+        original_topic_counts(survey)
+    assert counts.at[topics[0], 'Total'] <= len(survey) - 5
+
+
+def test_teacher_ranking_matches_per_teacher_averages(survey):
+    ranking = rank_teachers(survey).set_index('Teacher Name')
+    for teacher in survey['Teacher Name'].dropna().unique():
+        increase, _, students = get_df_percentages(survey[survey['Teacher Name'] == teacher])
+        assert ranking.at[teacher, 'Average % Increase'] == pytest.approx(increase)
+        assert ranking.at[teacher, 'Average # of Students'] == pytest.approx(students)
+    assert ranking['Average % Increase'].is_monotonic_decreasing
+
+
+def test_heritage_yes_is_at_least_one(survey):
+    answers = survey['History & Heritage Positive Motivators?'].astype(object).str.lower()
+    yes, no = heritage_counts(build_cube(survey))
+    assert (yes, no) == ((answers == 'yes').sum(), (answers == 'no').sum())
+
+    nobody = survey.assign(**{'History & Heritage Positive Motivators?': 'No'})
+    assert heritage_counts(build_cube(nobody)) == (1, len(survey))  # like the original app's get('yes', 1)
+
+
+def health_sheets(workbook):
+    weight = workbook[weight_sheet_name].copy()
+    weight['Sex'] = weight['Sex'].astype(object)
+    weight.loc[weight.index[:4], 'Sex'] = ['m', '?', np.nan, 'M? ']  # none of them are counted as M or F
+    return weight, workbook[bp_sheet_name], workbook[waist_sheet_name]
+
+
+def test_health_statistics_match_the_original_app(workbook):
+    weight, bp, waist = health_sheets(workbook)
+    stats = health_statistics(weight, bp, waist)
+    males, females = weight[weight['Sex'] == 'M'], weight[weight['Sex'] == 'F']
+    assert stats['students'] == len(weight)
+    assert stats['average_weight_loss'] == pytest.approx(weight['Weight Change lbs.'].mean())
+    assert (stats['males'], stats['females']) == (len(males), len(females))
+    assert stats['males'] + stats['females'] == len(weight) - 4
+    assert stats['average_male_loss'] == pytest.approx(males['Weight Change lbs.'].mean())
+    assert stats['average_female_loss'] == pytest.approx(females['Weight Change lbs.'].mean())
+
+    ratings = bp['Change in New HPB Rating']
+    assert stats['percent_bp'] == pytest.approx([100 * (ratings == label).mean()
+                                                 for label in ['Decrease', 'No Change', 'Increase']])
+    assert stats['average_sys_bp'] == pytest.approx(bp['Change in Sys BP'].mean())
+    lost = waist['Inches Lossed']
+    assert stats['percent_waist'] == pytest.approx([100 * (lost > 0).mean(), 100 * (lost == 0).mean(),
+                                                    100 * (lost < 0).mean()])
+
+
+def test_blank_health_values_are_left_out(workbook):
+    weight, bp, waist = health_sheets(workbook)
+    weight = weight.copy()
+    weight.loc[weight.index[-10:], 'Weight Change lbs.'] = np.nan
+    stats = health_statistics(weight, bp, waist)
+    assert stats['students'] == len(weight)
+    assert stats['average_weight_loss'] == pytest.approx(weight['Weight Change lbs.'].dropna().mean())
+
+
+def test_stage_transitions_count_start_and_end_stages(workbook):
+    bp = workbook[bp_sheet_name]
+    stats = health_statistics(*health_sheets(workbook))
+    expected = pd.crosstab(bp['Unnamed: 7'], bp['Unnamed: 11'])
+    for start, ends in stats['stage_transitions'].items():
+        for end, students in ends.items():
+            assert students == (expected.at[start, end] if start in expected.index and end in expected else 0)
+    assert sum(sum(ends.values()) for ends in stats['stage_transitions'].values()) == len(bp)
+
+    table = health_table(health_counts(*health_sheets(workbook), by='Sex'))
+    assert sum(statistic(table, 'HPB Stage', 'HPB Stage 2 to HPB Stage 1', sex) for sex in ['F', 'M']) == \
+        ((bp['Unnamed: 8'] == 4) & (bp['Unnamed: 12'] == 3) & bp['Sex'].isin(['F', 'M'])).sum()
@@ -0,0 +1,52 @@
+import numpy as np
+import pandas as pd
+
+from keywords import tokenize
+from responses import clean_responses
+from search import ResponseIndex
+
+responses = {
+    'Recipes': pd.Series(['Sweet potato stew', 'Kale salad!', 'potatoes and kale, kale'], index=[10, 11, 12]),
+    'Comments': pd.Series(['more kale please', np.nan, 'Time'], index=[10, 13, 14]),
+}
+
+
+def test_prefix_terms_match_every_word_they_start():
+    index = ResponseIndex(responses)
+    assert set(index.search('pot*').index) == {10, 12}
+    assert list(index.search('potato').index) == [10]
+    assert set(index.search('POTATO*').index) == {10, 12}
+
+
+def test_every_query_word_must_match():
+    index = ResponseIndex(responses)
+    assert list(index.search('kale potatoes').index) == [12]
+    assert index.search('kale okra').empty
+    assert index.search('').empty
+
+
+def test_row_and_question_filters():
+    index = ResponseIndex(responses)
+    assert set(index.search('kale').index) == {10, 11, 12}
+    assert list(index.search('kale', rows=[11, 14]).index) == [11]
+    assert list(index.search('kale', columns=['Comments'])['Response']) == ['more kale please']
+
+
+def test_results_are_ranked_and_tokenized_like_the_keywords():
+    index = ResponseIndex(responses)
+    found = index.search('kale')
+    assert found['Score'].is_monotonic_decreasing
+    assert found.index[0] == 12  # says kale twice
+    assert list(index.search('salad').index) == [11]  # punctuation and case are ignored
+
+
+def test_every_matching_survey_response_is_found(workbook):
+    survey = workbook['Student Lifestyle Surveys']
+    cleaned = clean_responses(survey)
+    index = ResponseIndex(cleaned)
+    rows = survey.index[::2]
+    found = index.search('greens', rows=rows, limit=len(index))
+    expected = sum('greens' in tokenize(text) and row in set(rows)
+                   for answers in cleaned.values() for row, text in answers.items())
+    assert len(found) == expected > 0
+    assert found.index.isin(rows).all()
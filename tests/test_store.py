@@ -0,0 +1,114 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import store as store_module
+
+from analysis import bp_sheet_name, health_statistics, sheet_name, waist_sheet_name, weight_sheet_name
+from cube import build_cube, cell_topic_counts, select, student_count
+from improvements import topic_counts
+from ingest import write_parquet
+from store import StudentStore
+
+
+def halves(workbook, start, end):
+    '''
+    The rows of every sheet from start to end, as fractions of its length
+    '''
+    return {sheet: frame.iloc[int(start * len(frame)):int(end * len(frame))] for sheet, frame in workbook.items()}
+
+
+def assert_same_statistics(actual, expected):
+    '''
+    Health statistics equal up to the order the floats were summed in
+    '''
+    assert actual.keys() == expected.keys()
+    for name in expected:
+        if isinstance(expected[name], dict):  # counts, not sums
+            assert actual[name] == expected[name], name
+        else:
+            np.testing.assert_allclose(actual[name], expected[name], err_msg=name)
+
+
+def test_cube_topic_counts_match_students(workbook):
+    df = workbook[sheet_name]
+    pd.testing.assert_frame_equal(cell_topic_counts(build_cube(df)), topic_counts(df), check_dtype=False)
+
+
+def test_selected_cube_matches_filtered_students(workbook):
+    df = workbook[sheet_name]
+    teacher = df['Teacher Name'].dropna().iloc[0]
+    years = df['Class End Date (year)']
+    filtered = df[(years >= years.min() + 1) & (df['Teacher Name'] == teacher)]
+    cells = select(build_cube(df), int(years.min()) + 1, int(years.max()), [teacher])
+    assert student_count(cells) == len(filtered)
+    pd.testing.assert_frame_equal(cell_topic_counts(cells), topic_counts(filtered), check_dtype=False)
+
+
+def test_ingesting_the_same_file_twice_adds_nothing(workbook, tmp_path):
+    store = StudentStore(str(tmp_path))
+    added = store.ingest(workbook, 'digest')
+    assert added == {sheet: len(frame) for sheet, frame in workbook.items()}
+    assert not any(store.ingest(workbook, 'digest').values())
+    assert not any(store.ingest(workbook).values())  # same rows without the digest to recognize them by
+    assert store.rows() == {sheet: len(frame) for sheet, frame in workbook.items()}
+
+
+def test_corrected_health_values_add_no_students(workbook, tmp_path):
+    store = StudentStore(str(tmp_path))
+    store.ingest(workbook, 'first')
+    corrected = dict(workbook)
+    corrected[weight_sheet_name] = workbook[weight_sheet_name].copy()
+    corrected[weight_sheet_name].iloc[0, corrected[weight_sheet_name].columns.get_loc('Weight Change lbs.')] += 0.5
+    assert not any(store.ingest(corrected, 'second').values())
+    assert store.health_statistics()['students'] == len(workbook[weight_sheet_name])
+
+
+def test_overlapping_halves_add_up_to_the_whole(workbook, tmp_path):
+    store = StudentStore(str(tmp_path))
+    store.ingest(halves(workbook, 0, 0.6), 'first')
+    added = store.ingest(halves(workbook, 0.4, 1), 'second')
+    assert added[sheet_name] == len(workbook[sheet_name]) - int(0.6 * len(workbook[sheet_name]))
+    assert store.rows() == {sheet: len(frame) for sheet, frame in workbook.items()}
+
+    whole = build_cube(workbook[sheet_name])
+    assert student_count(store.cube) == student_count(whole)
+    pd.testing.assert_frame_equal(cell_topic_counts(store.cube), cell_topic_counts(whole), check_dtype=False)
+    assert_same_statistics(store.health_statistics(), health_statistics(
+        workbook[weight_sheet_name], workbook[bp_sheet_name], workbook[waist_sheet_name]))
+
+
+def test_reopening_gives_the_same_cube(workbook, tmp_path):
+    store = StudentStore(str(tmp_path))
+    store.ingest(halves(workbook, 0, 0.5), 'first')
+    store.ingest(halves(workbook, 0.5, 1), 'second')
+    reopened = StudentStore(str(tmp_path))
+
+    def flat(cube):
+        return cube.reset_index().astype(str).sort_values(list(cube.index.names)).reset_index(drop=True)
+
+    pd.testing.assert_frame_equal(flat(reopened.cube), flat(store.cube))
+    assert reopened.rows() == store.rows()
+    assert reopened.workbooks == {'first', 'second'}
+    assert_same_statistics(reopened.health_statistics(), store.health_statistics())
+    assert not any(reopened.ingest(workbook).values())
+
+
+def test_failed_write_stores_nothing(workbook, tmp_path, monkeypatch):
+    store = StudentStore(str(tmp_path))
+    written = []
+
+    def fail_second_part(df, path):
+        if written:
+            raise OSError('disk full')
+        written.append(path)
+        write_parquet(df, path)
+
+    monkeypatch.setattr(store_module, 'write_parquet', fail_second_part)
+    with pytest.raises(OSError):
+        store.ingest(workbook, 'digest')
+    assert not any(store.rows().values()) and not store.workbooks
+    assert not any(StudentStore(str(tmp_path)).rows().values())
+
+    monkeypatch.setattr(store_module, 'write_parquet', write_parquet)
+    assert store.ingest(workbook, 'digest') == {sheet: len(frame) for sheet, frame in workbook.items()}